@@ -1,7 +1,10 @@
 import datetime
+import json
 import typing
 from pathlib import Path
 
+import blake3
+
 __version__ = "2023.10.1"
 
 
@@ -30,6 +33,13 @@ class BuildKey:
 
     _version2_hash_size = 8
 
+    _version3_hash_size = 8
+
+    # Specification.sha256 -> BLAKE3 hash prefix. The canonicalization and
+    # hashing only ever run once per specification in a process; afterwards
+    # version 3 keys cost a dict lookup, like the column read in version 2.
+    _version3_hashes: typing.Dict[str, str] = {}
+
     def _version1_fmt(build: "Build") -> str:  # noqa: F821
         datetime_format = "%Y%m%d-%H%M%S-%f"
         hash = build.specification.sha256
@@ -46,10 +56,31 @@ class BuildKey:
         name = build.specification.name
         return f"{hash}-{timestamp}-{id}-{name}"
 
+    def _version3_fmt(build: "Build") -> str:  # noqa: F821
+        # Same layout as version 2, but the hash prefix is BLAKE3 computed
+        # over the same canonical JSON used for Specification.sha256,
+        # memoized by that sha256 so the canonicalization and hashing are
+        # not repeated on every lockfile request.
+        tzinfo = datetime.timezone.utc
+        hash = BuildKey._version3_hashes.get(build.specification.sha256)
+        if hash is None:
+            from conda_store_server import utils
+
+            spec_blob = json.dumps(utils.recursive_sort(build.specification.spec))
+            hash = blake3.blake3(spec_blob.encode("utf-8")).hexdigest(
+                length=BuildKey._version3_hash_size // 2
+            )
+            BuildKey._version3_hashes[build.specification.sha256] = hash
+        timestamp = int(build.scheduled_on.replace(tzinfo=tzinfo).timestamp())
+        id = build.id
+        name = build.specification.name
+        return f"{hash}-{timestamp}-{id}-{name}"
+
     # version -> fmt function
     _fmt = {
         1: _version1_fmt,
         2: _version2_fmt,
+        3: _version3_fmt,
     }
 
     @classmethod
@@ -93,7 +124,7 @@ class BuildKey:
         # versions because name can contain dashes. Instead, this relies on the
         # hash size to infer the format. The name is the last field, so indexing
         # to find the id is okay.
-        if build_key[cls._version2_hash_size] == "-":  # v2
+        if build_key[cls._version2_hash_size] == "-":  # v2/v3 (same layout)
             return int(parts[2])  # build_id
         else:  # v1
             return int(parts[4])  # build_id
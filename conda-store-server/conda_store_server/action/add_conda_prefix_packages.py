@@ -66,4 +66,5 @@ def action_add_conda_prefix_packages(
         if conda_package_build is None:
             continue  # pypi package
         build.package_builds.append(conda_package_build)
-        db.commit()
+    # a single commit for all packages instead of one commit (fsync) each
+    db.commit()
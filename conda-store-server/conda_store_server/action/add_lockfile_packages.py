@@ -46,4 +46,5 @@ def action_add_lockfile_packages(
         if conda_package_build is None:
             continue  # pypi package
         solve.package_builds.append(conda_package_build)
-        db.commit()
+    # a single commit for all packages instead of one commit (fsync) each
+    db.commit()
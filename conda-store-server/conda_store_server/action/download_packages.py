@@ -1,3 +1,4 @@
+import json
 import pathlib
 import shutil
 import typing
@@ -39,3 +40,29 @@ def action_fetch_and_extract_conda_packages(
                     with file_path.open("wb") as f:
                         shutil.copyfileobj(conda_package_stream, f)
                     conda_package_handling.api.extract(str(file_path))
+
+
+@action.action
+def action_fetch_conda_info(
+    context,
+    conda_lock_spec: typing.Dict,
+    platforms: typing.List[str] = [conda_utils.conda_platform(), "noarch"],
+):
+    """Fetch only `info/index.json` for packages in a conda-lock specification
+
+    Unlike `action_fetch_and_extract_conda_packages` this streams just the
+    metadata via ranged requests instead of downloading and extracting the
+    full archives, so it is suitable when only package metadata is needed.
+    """
+    package_infos = {}
+
+    for package in conda_lock_spec["package"]:
+        if package["manager"] == "conda" and package["platform"] in platforms:
+            url = package["url"]
+            filename = pathlib.Path(url).name
+            context.log.info(f"FETCH INFO {filename}\n")
+            for tar, member in conda_package_streaming.url.stream_conda_info(url):
+                if member.name == "info/index.json":
+                    package_infos[filename] = json.load(tar.extractfile(member))
+                    break
+    return package_infos
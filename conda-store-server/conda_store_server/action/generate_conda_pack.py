@@ -10,8 +10,12 @@ def action_generate_conda_pack(
     conda_prefix: pathlib.Path,
     output_filename: pathlib.Path,
 ):
+    # the archive format is inferred from the output filename suffix; zstd
+    # (.tar.zst) compresses several times faster than gzip at a comparable
+    # ratio, and n_threads=-1 lets the compressor use all cores
     conda_pack.pack(
         prefix=str(conda_prefix),
         output=str(output_filename),
+        n_threads=-1,
         ignore_missing_files=True,
     )
@@ -6,6 +6,7 @@ executing conda commands
 
 import bz2
 import datetime
+import functools
 import json
 import pathlib
 import subprocess
@@ -164,10 +165,14 @@ def download_repodata(
     return repodata
 
 
+@functools.lru_cache(maxsize=None)
 def conda_platform():
     """
     Return the platform (in ``conda`` style) the server is running on.
 
+    The result is cached since the platform cannot change while the server
+    is running.
+
     It will be one of the values in ``conda.base.constants.KNOWN_SUBDIRS``.
     """
     from conda.base.context import context
@@ -57,25 +57,29 @@ def chdir(directory: pathlib.Path):
 def du(path):
     """
     Pure Python equivalent of du -sb
-    Based on https://stackoverflow.com/a/55648984/161801
+
+    Uses an iterative os.scandir walk; scandir returns stat information with
+    each directory entry, avoiding the extra stat syscall per file that an
+    os.walk + os.lstat traversal pays.
     """
     if os.path.islink(path) or os.path.isfile(path):
         return os.lstat(path).st_size
-    nbytes = 0
+
+    nbytes = os.lstat(path).st_size
     seen = set()
-    for dirpath, dirnames, filenames in os.walk(path):
-        nbytes += os.lstat(dirpath).st_size
-        for f in filenames:
-            fp = os.path.join(dirpath, f)
-            st = os.lstat(fp)
-            if st.st_ino in seen:
-                continue
-            seen.add(st.st_ino)  # adds inode to seen list
-            nbytes += st.st_size  # adds bytes to total
-        for d in dirnames:
-            dp = os.path.join(dirpath, d)
-            if os.path.islink(dp):
-                nbytes += os.lstat(dp).st_size
+    stack = [path]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                stat = entry.stat(follow_symlinks=False)
+                if entry.is_dir(follow_symlinks=False):
+                    nbytes += stat.st_size
+                    stack.append(entry.path)
+                else:
+                    if stat.st_ino in seen:
+                        continue
+                    seen.add(stat.st_ino)  # adds inode to seen list
+                    nbytes += stat.st_size  # adds bytes to total
     return nbytes
 
 
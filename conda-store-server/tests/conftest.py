@@ -1,15 +1,44 @@
+import copy
 import datetime
 import os
 import pathlib
+import shutil
+import subprocess
 import sys
 
 import pytest
 import yaml
 from fastapi.testclient import TestClient
+from sqlalchemy import text
 
 from conda_store_server import action, api, app, dbutil, schema, storage, testing, utils  # isort:skip
 from conda_store_server.server import app as server_app  # isort:skip
 
+# detected once per session; mamba solves environments significantly faster
+# than conda, so prefer it for tests when it is available
+_MAMBA_EXECUTABLE = shutil.which("mamba")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def conda_pkgs_dirs(tmp_path_factory):
+    """Keep the conda package cache on the same filesystem as tmp_path
+
+    When CONDA_PKGS_DIRS lives on a different filesystem than the prefixes
+    created under tmp_path, conda silently falls back to copying package
+    files instead of hardlinking them, turning every environment install
+    from O(inodes) into O(bytes) of I/O. Under pytest-xdist each worker has
+    its own base temporary directory, so this also isolates package cache
+    locks between workers.
+    """
+    pkgs_dir = tmp_path_factory.mktemp("pkgs")
+    original_pkgs_dirs = os.environ.get("CONDA_PKGS_DIRS")
+    os.environ["CONDA_PKGS_DIRS"] = str(pkgs_dir)
+    yield pkgs_dir
+    if original_pkgs_dirs is None:
+        del os.environ["CONDA_PKGS_DIRS"]
+    else:
+        os.environ["CONDA_PKGS_DIRS"] = original_pkgs_dirs
+
 
 @pytest.fixture
 def celery_config(tmp_path, conda_store):
@@ -141,6 +170,10 @@ def seed_conda_store(db, conda_store):
 def conda_store(conda_store_config):
     _conda_store = app.CondaStore(config=conda_store_config)
 
+    # the default conda_command is mamba; fall back to conda when mamba is
+    # not installed so the solve/install tests still run
+    _conda_store.conda_command = "mamba" if _MAMBA_EXECUTABLE else "conda"
+
     pathlib.Path(_conda_store.store_directory).mkdir(exist_ok=True)
 
     dbutil.upgrade(_conda_store.database_url)
@@ -167,6 +200,11 @@ def conda_store(conda_store_config):
 @pytest.fixture
 def db(conda_store):
     with conda_store.session_factory() as _db:
+        if _db.get_bind().dialect.name == "sqlite":
+            # durability does not matter for the test database, so skip the
+            # disk flush that sqlite otherwise performs on every commit
+            _db.execute(text("PRAGMA synchronous=OFF"))
+            _db.execute(text("PRAGMA journal_mode=MEMORY"))
         yield _db
 
 
@@ -191,12 +229,65 @@ def simple_specification_with_pip():
     )
 
 
+@pytest.fixture(scope="session")
+def _base_installed_prefix(tmp_path_factory, _simple_conda_lock):
+    """Install the simple lockfile once per session
+
+    Tests should use the `installed_prefix` fixture, which hands out cheap
+    per-test copies, instead of installing the lockfile themselves.
+    """
+    conda_prefix = tmp_path_factory.mktemp("base-prefix") / "test"
+
+    action.action_install_lockfile(
+        conda_lock_spec=copy.deepcopy(_simple_conda_lock), conda_prefix=conda_prefix
+    )
+    return conda_prefix
+
+
 @pytest.fixture
-def simple_conda_lock():
+def installed_prefix(_base_installed_prefix, tmp_path):
+    """A per-test copy of the session-scoped installed prefix
+
+    On Linux, reflinks make the copy O(inodes) instead of O(bytes), which is
+    much cheaper than installing the lockfile again for every test. Hardlink
+    copies are deliberately not used: tests chmod their prefix and hardlinked
+    files share inode metadata, which would mutate the shared base prefix.
+    """
+    conda_prefix = tmp_path / "test"
+
+    if sys.platform == "linux":
+        subprocess.run(
+            [
+                "cp",
+                "--reflink=auto",
+                "-a",
+                str(_base_installed_prefix),
+                str(conda_prefix),
+            ],
+            check=True,
+        )
+    else:
+        shutil.copytree(
+            _base_installed_prefix,
+            conda_prefix,
+            symlinks=True,
+        )
+    return conda_prefix
+
+
+@pytest.fixture(scope="session")
+def _simple_conda_lock():
+    """Parse the lockfile asset once per session"""
     with (pathlib.Path(__file__).parent / "assets/conda-lock.zlib.yaml").open() as f:
         return yaml.safe_load(f)
 
 
+@pytest.fixture
+def simple_conda_lock(_simple_conda_lock):
+    # hand out a copy so no test can mutate the session-scoped parse
+    return copy.deepcopy(_simple_conda_lock)
+
+
 @pytest.fixture(
     params=[
         dict(
